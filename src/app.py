@@ -1,17 +1,28 @@
+import tracemalloc
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
 from types import SimpleNamespace
 
-from data import LOCATIONS, GEODFS
-from models import Quiz
+from config import CONFIG
+from lib import profiling
+
+# Before loading data, s.t. the traced memory includes it.
+if CONFIG["profiling"]["enabled"]:
+    profiling.start_tracing()
+
+from data import LOCATIONS
+from models import Quiz, StatisticsStore
 from lib import map
 
 STATE_VARIABLES = [
     "quiz",
+    "quiz_recorded",
+    "user_name",
     "question_type",
     "location_types",
     "n_questions",
+    "focus_difficult",
     "await_continue_reason",
     "provided_answer",
     "open_answer",
@@ -24,6 +35,8 @@ def main() -> None:
     st.title("StreetSmart Topography Quiz")
     with st.sidebar:
         display_quiz_settings(state)
+        if CONFIG["profiling"]["enabled"]:
+            display_memory_profile(state)
     if not state.quiz:
         with st.container(border=True):
             st.header("Fill out settings in the sidebar to start")
@@ -33,11 +46,13 @@ def main() -> None:
     else:
         display_progress(state)
         display_question(state)
-        display_answer_input(state)
+        display_answer_input()
 
 
 def display_quiz_settings(state: SimpleNamespace) -> None:
+    location_types = [type for type, locations in LOCATIONS.items() if locations]
     with st.form("Quiz settings"):
+        st.text_input("Your name", "anonymous", key="user_name")
         st.selectbox(
             "Choose a quiz type",
             ["Open answer", "Multiple choice"],
@@ -46,21 +61,42 @@ def display_quiz_settings(state: SimpleNamespace) -> None:
         )
         st.multiselect(
             "Choose locations types to quiz",
-            ["streets"],
+            location_types,
             ["streets"],
             key="location_types",
         )
         st.slider(
             "Choose number of questions",
             5,
-            len(LOCATIONS["streets"]),
+            sum(len(LOCATIONS[type]) for type in location_types),
             5,
             key="n_questions",
         )
+        st.checkbox(
+            "Focus on locations that are often answered wrong",
+            key="focus_difficult",
+        )
         button_text = "Start" if not state.quiz else "Restart"
         st.form_submit_button(button_text, on_click=handle_settings_submit_click)
 
 
+def display_memory_profile(state: SimpleNamespace) -> None:
+    """
+    Memory traced by the whole server process since startup, and held by the quiz of
+    this session.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    with st.expander("Memory"):
+        st.text(f"Process traced: {profiling.format_size(current)}")
+        st.text(f"Process peak traced: {profiling.format_size(peak)}")
+        cache_size = map.get_prefetch_cache_size()
+        st.text(f"Map prefetch cache: {profiling.format_size(cache_size)}")
+        if state.quiz:
+            breakdown = profiling.get_quiz_breakdown(state.quiz)
+            for name, size in breakdown.items():
+                st.text(f"Quiz {name}: {profiling.format_size(size)}")
+
+
 def display_finish_statistics(state: SimpleNamespace) -> None:
     stats = state.quiz.get_statistics()
     st.balloons()
@@ -69,6 +105,41 @@ def display_finish_statistics(state: SimpleNamespace) -> None:
     st.text(f'Correct answers: {stats["n_correct_answers"]}')
     st.text(f'Correct on first try: {stats["n_first_try"]}')
     st.text(f'Revealed: {stats["n_revealed"]}')
+    display_leaderboard(state)
+
+
+def display_leaderboard(state: SimpleNamespace) -> None:
+    store = get_statistics_store()
+    if not state.quiz_recorded:
+        store.record_quiz(state.quiz, user=state.user_name or "anonymous")
+        st.session_state["quiz_recorded"] = True
+    n = CONFIG["statistics"]["n_leaderboard"]
+    col_1, col_2 = st.columns(2)
+    with col_1:
+        st.subheader("Leaderboard")
+        st.dataframe(
+            store.get_leaderboard(
+                n, min_questions=CONFIG["statistics"]["min_questions_leaderboard"]
+            ),
+            column_order=["user", "first_try_rate", "n_questions", "n_quizzes"],
+            hide_index=True,
+        )
+    with col_2:
+        st.subheader("Hardest streets")
+        st.dataframe(
+            store.get_hardest_locations(
+                n,
+                location_type="streets",
+                min_asked=CONFIG["statistics"]["min_asked_hardest"],
+            ),
+            column_order=["location_name", "first_try_rate", "reveal_rate"],
+            hide_index=True,
+        )
+
+
+@st.cache_resource
+def get_statistics_store() -> StatisticsStore:
+    return StatisticsStore(CONFIG["statistics"]["database"])
 
 
 def display_progress(state: SimpleNamespace) -> None:
@@ -90,12 +161,19 @@ def display_question(state: SimpleNamespace) -> None:
         st.header(question.question_prompt)
         satellite_toggle = st.toggle("Satellite")
         location = question.answer
-        locations = list(LOCATIONS["streets"].keys())
-        map.display_map(location, locations, satellite_toggle)
+        map.display_map(location, question.location_type, satellite_toggle)
 
 
-def display_answer_input(state: SimpleNamespace) -> None:
+@st.fragment
+def display_answer_input() -> None:
+    """
+    Fragment s.t. answering only reruns the answer panel, not the question and map.
+    The full app is rerun once the quiz progresses to the next question.
+    """
+    state = get_state()
     quiz = state.quiz
+    if quiz.status == "Finished" or quiz.current_question is None:
+        st.rerun()
     question = quiz.current_question
     question_type = state.question_type
     awaiting_continue = state.await_continue_reason is not None
@@ -111,7 +189,8 @@ def display_answer_input(state: SimpleNamespace) -> None:
     feedback_container = st.container(border=False)
 
     if provided_answer:
-        is_correct = quiz.check_answer(provided_answer, progress_quiz=False)
+        # Grade without marking, the handlers already marked this answer.
+        is_correct = question.check_answer(provided_answer)
         if is_correct:
             feedback_container.success(f'Correct! The answer is "{question.answer}".')
         elif not is_correct and not awaiting_continue:
@@ -119,6 +198,9 @@ def display_answer_input(state: SimpleNamespace) -> None:
                 f'Oops! "{provided_answer}" is not correct. Try again!'
             )
 
+    if awaiting_continue:
+        prefetch_next_question(state)
+
     col_1, col_2, col_3 = st.columns(3)
     with col_1:
         st.button(
@@ -145,6 +227,15 @@ def display_answer_input(state: SimpleNamespace) -> None:
             )
 
 
+def prefetch_next_question(state: SimpleNamespace) -> None:
+    """
+    Prepares the map of the next question while the user reads the feedback.
+    """
+    next_question = state.quiz.peek_next()
+    if next_question:
+        map.prefetch_map_payload(next_question.answer, next_question.location_type)
+
+
 def display_open_question_input(state: SimpleNamespace) -> None:
     provided_answer = state.provided_answer
     question = state.quiz.current_question
@@ -171,10 +262,10 @@ def display_mc_question_input(state: SimpleNamespace) -> None:
             with col:
                 st.button(
                     options[button_index],
-                    key=f"mc_button_{button_index}",
+                    key=f"mc_button_{question.id}_{button_index}",
                     disabled=awaiting_continue,
                     on_click=handle_multiple_choice_click,
-                    args=[button_index],
+                    args=[question.id, button_index],
                 )
 
 
@@ -186,14 +277,20 @@ def handle_settings_submit_click() -> None:
     if not (state.question_type and state.location_types and state.n_questions):
         st.text("Please supply all inputs")
         return
+    weights = None
+    if state.focus_difficult:
+        store = get_statistics_store()
+        weights = {type: store.get_weights(type) for type in state.location_types}
     quiz = Quiz(
         location_input=LOCATIONS,
         question_type=state.question_type,
         location_types=state.location_types,
         n_questions=state.n_questions,
+        weights=weights,
     )
     quiz.start_quiz()
     st.session_state["quiz"] = quiz
+    st.session_state["quiz_recorded"] = False
 
 
 def handle_answer_submit_click() -> None:
@@ -208,10 +305,15 @@ def handle_answer_submit_click() -> None:
         st.session_state["await_continue_reason"] = "answer_submission"
 
 
-def handle_multiple_choice_click(button_index: int) -> None:
+def handle_multiple_choice_click(question_id: str, button_index: int) -> None:
+    """
+    Ignores clicks on options of a question that is no longer current.
+    """
     state = get_state()
     quiz = state.quiz
     question = quiz.current_question
+    if question is None or question.id != question_id:
+        return
     mc_answer = question.multiple_choice_options[button_index]
     st.session_state["provided_answer"] = mc_answer
     is_correct = quiz.check_answer(mc_answer, progress_quiz=False)
@@ -1,4 +1,6 @@
 from data.load import load_geodfs, load_locations
+from data.index import build_geometry_index
 
 GEODFS = load_geodfs()
 LOCATIONS = load_locations()
+GEOMETRIES = build_geometry_index(GEODFS, LOCATIONS)
@@ -0,0 +1,52 @@
+from collections import defaultdict
+from geopandas import GeoDataFrame
+
+GEOMETRY_TYPES = {
+    "streets": ["LineString", "MultiLineString"],
+    "areas": ["Polygon", "MultiPolygon"],
+    "landmarks": ["Point", "MultiPoint", "Polygon", "MultiPolygon"],
+}
+
+
+def build_geometry_index(
+    geodfs: list[GeoDataFrame], locations: dict[str, dict[str, dict[str, str]]]
+) -> dict[str, dict[str, GeoDataFrame]]:
+    """
+    Geometries per location type and name, only for the quizzable locations. Rows with
+    a geometry matching the location type are preferred, e.g. for a square and a street
+    sharing a name. Rows with a list of names, e.g. merged ways, are indexed per name.
+    """
+    all_names = {name for names in locations.values() for name in names}
+    rows_per_name = defaultdict(list)
+    for geodf in geodfs:
+        if "name" not in geodf.columns:
+            continue
+        geodf = geodf.explode("name")
+        geodf = geodf[geodf["name"].isin(all_names)]
+        for name, rows in geodf.groupby("name"):
+            rows_per_name[name].append(rows)
+
+    index = dict()
+    for location_type, names in locations.items():
+        geometry_types = GEOMETRY_TYPES[location_type]
+        index[location_type] = dict()
+        for name in names:
+            candidates = rows_per_name.get(name)
+            if not candidates:
+                continue
+            matching = [
+                rows[rows.geom_type.isin(geometry_types)] for rows in candidates
+            ]
+            matching = [rows for rows in matching if len(rows) > 0]
+            index[location_type][name] = (matching or candidates)[0]
+    return index
+
+
+if __name__ == "__main__":
+    """
+    Inspect index.
+    """
+    from data import GEOMETRIES
+
+    for location_type, geometries in GEOMETRIES.items():
+        print(location_type, len(geometries))
@@ -1,33 +1,114 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import threading
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
-from shapely.geometry import LineString
+from shapely.geometry import (
+    LineString,
+    MultiLineString,
+    MultiPoint,
+    MultiPolygon,
+    Point,
+    Polygon,
+)
+from shapely.ops import polylabel
 from geopandas import GeoDataFrame
-from data import GEODFS
+from data import GEOMETRIES
+from lib.profiling import get_deep_size
 
+MAX_PREFETCHED_PAYLOADS = 64
+STYLES = {
+    "streets": {"color": "red", "weight": 5},
+    "areas": {"color": "red", "weight": 2, "fillColor": "red", "fillOpacity": 0.3},
+    "landmarks": {"color": "red", "weight": 3, "fillColor": "red", "fillOpacity": 0.6},
+}
 
-def display_map(location: str, locations: list[str], use_satellite_layer: bool) -> None:
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="map")
+_prefetched_payloads: OrderedDict[tuple[str, str], Future] = OrderedDict()
+_prefetch_lock = threading.Lock()
+
+
+def display_map(location: str, location_type: str, use_satellite_layer: bool) -> None:
     print(location)
     map = create_blank_map(use_satellite_layer)
-    feature_groups = generate_feature_groups(locations, GEODFS)
-    lat, lon = calculate_average_coord(location, GEODFS)
+    feature_group, (lat, lon) = get_map_payload(location, location_type)
     st_folium(
         map,
         width=800,
         height=400,
         center=(lat, lon),
         returned_objects=[],
-        feature_group_to_add=feature_groups[location],
+        feature_group_to_add=feature_group,
     )
 
 
-def generate_feature_groups(locations: str, _geodfs: list) -> dict:
+def prefetch_map_payload(location: str, location_type: str) -> None:
+    """
+    Builds the map payload of a location in the background, e.g. for the next question
+    while the user is still reading the feedback on the current one.
+    """
+    key = (location_type, location)
+    with _prefetch_lock:
+        if key in _prefetched_payloads:
+            return
+        _prefetched_payloads[key] = _prefetch_executor.submit(
+            build_map_payload, location, location_type, GEOMETRIES
+        )
+        while len(_prefetched_payloads) > MAX_PREFETCHED_PAYLOADS:
+            _, future = _prefetched_payloads.popitem(last=False)
+            future.cancel()
+
+
+def get_map_payload(
+    location: str, location_type: str
+) -> tuple[folium.FeatureGroup, tuple[float]]:
+    """
+    Uses the prefetched payload if available, otherwise builds it right away.
+    """
+    with _prefetch_lock:
+        future = _prefetched_payloads.pop((location_type, location), None)
+    if future is not None and not future.cancelled():
+        return future.result()
+    return build_map_payload(location, location_type, GEOMETRIES)
+
+
+def wait_for_prefetched_payloads() -> None:
+    with _prefetch_lock:
+        futures = list(_prefetched_payloads.values())
+    wait(futures)
+
+
+def get_prefetch_cache_size() -> int:
+    """
+    Bytes held by the prefetched payloads, including ones still being built.
+    """
+    with _prefetch_lock:
+        futures = list(_prefetched_payloads.values())
+    return get_deep_size([future.result() for future in futures if future.done()])
+
+
+def build_map_payload(
+    location: str, location_type: str, _geometries: dict[str, dict[str, GeoDataFrame]]
+) -> tuple[folium.FeatureGroup, tuple[float]]:
+    feature_groups = generate_feature_groups([location], location_type, _geometries)
+    centre = calculate_centre_coord(location, location_type, _geometries)
+    return feature_groups[location], centre
+
+
+def generate_feature_groups(
+    locations: list[str],
+    location_type: str,
+    _geometries: dict[str, dict[str, GeoDataFrame]],
+) -> dict:
+    style = STYLES[location_type]
     feature_groups = {}
     for loc in locations:
-        geo_df = filter_geodfs(loc, _geodfs)
+        geo_df = get_location_geodf(loc, location_type, _geometries)
         geo_json = folium.GeoJson(
             geo_df,
-            style_function=lambda feature: {"color": "red", "weight": 5},
+            style_function=lambda feature: style,
+            marker=folium.CircleMarker(radius=8, fill=True),
         )
         feature_group = folium.FeatureGroup(name=loc)
         feature_group.add_child(geo_json)
@@ -35,12 +116,15 @@ def generate_feature_groups(locations: str, _geodfs: list) -> dict:
     return feature_groups
 
 
-def filter_geodfs(location: str, _geodfs: list[GeoDataFrame]) -> GeoDataFrame:
-    for geodf in _geodfs:
-        filtered_geodf = geodf[geodf["name"] == location]
-        if len(filtered_geodf) > 0:
-            return filtered_geodf
-    raise Exception(f"Could not find coordinates for {location}.")
+def get_location_geodf(
+    location: str,
+    location_type: str,
+    _geometries: dict[str, dict[str, GeoDataFrame]],
+) -> GeoDataFrame:
+    geodf = _geometries.get(location_type, dict()).get(location)
+    if geodf is None:
+        raise Exception(f"Could not find coordinates for {location}.")
+    return geodf
 
 
 @st.cache_data
@@ -63,19 +147,50 @@ def create_blank_map(use_satellite_layer: bool) -> None:
     )
 
 
-def calculate_average_coord(location: str, _geodfs: list[GeoDataFrame]) -> tuple[float]:
-    geodf = filter_geodfs(location, _geodfs)
+def calculate_centre_coord(
+    location: str,
+    location_type: str,
+    _geometries: dict[str, dict[str, GeoDataFrame]],
+) -> tuple[float]:
+    """
+    Label position of the location: inside the largest polygon if there is any,
+    otherwise the average of the line or point coordinates.
+    """
+    geodf = get_location_geodf(location, location_type, _geometries)
+    polygons = [
+        polygon
+        for geometry in geodf["geometry"]
+        if isinstance(geometry, (Polygon, MultiPolygon))
+        for polygon in getattr(geometry, "geoms", [geometry])
+    ]
+    if polygons:
+        return calculate_label_coord(max(polygons, key=lambda p: p.area))
+    return calculate_average_coord(location, geodf)
+
+
+def calculate_label_coord(polygon: Polygon) -> tuple[float]:
+    """
+    Pole of inaccessibility, i.e. the point inside the polygon furthest from its edges.
+    """
+    try:
+        point = polylabel(polygon, tolerance=1e-5)
+    except Exception:
+        point = polygon.representative_point()
+    return (point.y, point.x)
+
+
+def calculate_average_coord(location: str, geodf: GeoDataFrame) -> tuple[float]:
     total_latitude = 0.0
     total_longitude = 0.0
     total_points = 0
-    for line in geodf["geometry"]:
-        if not isinstance(line, LineString):
+    for geometry in geodf["geometry"]:
+        if not isinstance(geometry, (LineString, MultiLineString, Point, MultiPoint)):
             continue
-        coords = list(line.coords)
-        for x, y in coords:
-            total_longitude += x
-            total_latitude += y
-            total_points += 1
+        for part in getattr(geometry, "geoms", [geometry]):
+            for x, y in part.coords:
+                total_longitude += x
+                total_latitude += y
+                total_points += 1
     if total_points == 0:
         raise Exception(f"Could not calculate average coordinates for {location}")
     return (total_latitude / total_points, total_longitude / total_points)
@@ -0,0 +1,252 @@
+"""
+Memory profiling of quiz sessions. Simulates sessions headlessly and reports the bytes
+held per subsystem, e.g. to set capacity limits or catch leaks:
+
+    python -m src.lib.profiling --sessions 100
+
+With `profiling.enabled` in the config, the app calls `start_tracing` before loading
+data, s.t. it can report the memory traced by the whole process.
+"""
+
+import argparse
+import gc
+import importlib
+import random
+import sys
+import tracemalloc
+from types import FunctionType, ModuleType
+from typing import Any, Callable
+
+from models import Quiz
+
+EXCLUDED_TYPES = (type, ModuleType, FunctionType)
+# Imported before tracing, s.t. their import is not attributed to a subsystem.
+LIBRARIES = [
+    "pandas",
+    "pyarrow.compute",
+    "shapely",
+    "geopandas",
+    "folium",
+    "streamlit",
+    "streamlit_folium",
+]
+
+
+def start_tracing() -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def get_deep_size(obj: Any, seen: set[int] | None = None) -> int:
+    """
+    Bytes held by an object and everything it references, counting shared objects
+    once. Pass the same `seen` set to measure several objects without overlap.
+    """
+    seen = set() if seen is None else seen
+    total_size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, EXCLUDED_TYPES):
+            continue
+        seen.add(id(current))
+        total_size += sys.getsizeof(current)
+        stack.extend(gc.get_referents(current))
+    return total_size
+
+
+def get_quiz_breakdown(quiz: Quiz) -> dict[str, int]:
+    """
+    Bytes held per component of a quiz, in order s.t. shared objects are attributed to
+    the first component holding them.
+    """
+    tracker = quiz._question_tracker
+    seen = set()
+    components = {
+        "questions": quiz._questions,
+        "history": tracker._history,
+        "events": quiz.events,
+        "samplers": [tracker.pending_sampler, tracker.skipped_sampler],
+        "tracker": tracker,
+        "other": quiz,
+    }
+    return {name: get_deep_size(obj, seen) for name, obj in components.items()}
+
+
+def get_frames_size(geodfs: list) -> int:
+    """
+    Bytes held by the data of GeoDataFrames, as reported by pandas.
+    """
+    return sum(int(geodf.memory_usage(deep=True).sum()) for geodf in geodfs)
+
+
+def import_libraries() -> None:
+    for library in LIBRARIES:
+        try:
+            importlib.import_module(library)
+        except ImportError:
+            pass
+
+
+def measure(build: Callable[[], Any]) -> tuple[Any, int, list[tuple[str, int]]]:
+    """
+    Runs `build` and returns its result, with the bytes still allocated afterwards in
+    total and per file, based on tracemalloc snapshots.
+    """
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ]
+    gc.collect()
+    before = tracemalloc.take_snapshot().filter_traces(filters)
+    result = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(filters)
+    stats = [s for s in after.compare_to(before, "filename") if s.size_diff > 0]
+    per_file = [(s.traceback[0].filename, s.size_diff) for s in stats]
+    return result, sum(size for _, size in per_file), per_file
+
+
+def simulate_session(
+    location_input: dict[str, dict[str, dict[str, str]]],
+    question_type: str,
+    location_types: list[str],
+    n_questions: int | None,
+    rng: random.Random,
+) -> Quiz:
+    """
+    Plays a full quiz with a mix of skips, reveals and wrong answers.
+    """
+    quiz = Quiz(
+        location_input=location_input,
+        question_type=question_type,
+        location_types=location_types,
+        n_questions=n_questions,
+    )
+    quiz.start_quiz()
+    while quiz.status != "Finished":
+        question = quiz.ask_question()
+        quiz.peek_next()
+        action = rng.random()
+        if action < 0.1:
+            quiz.skip_question()
+        elif action < 0.2:
+            quiz.reveal_answer(progress_quiz=True)
+        else:
+            if action < 0.4:
+                quiz.check_answer("Wrong", progress_quiz=False)
+            quiz.check_answer(question.answer, progress_quiz=True)
+    return quiz
+
+
+def prefetch_map_payloads(map: ModuleType, questions: list) -> None:
+    """
+    Fills the prefetch cache of the app, which evicts beyond its maximum size.
+    """
+    for question in questions:
+        map.prefetch_map_payload(question.answer, question.location_type)
+    map.wait_for_prefetched_payloads()
+
+
+def format_size(size: float) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def print_sizes(title: str, sizes: list[tuple[str, float]]) -> None:
+    print(title)
+    for name, size in sizes:
+        print(f"  {format_size(size):>12}  {name}")
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    import_libraries()
+    # Restart s.t. traces and peak only cover what is measured below.
+    tracemalloc.stop()
+    tracemalloc.start()
+
+    _, geodata_size, geodata_files = measure(lambda: __import__("data"))
+    from data import LOCATIONS, GEODFS, GEOMETRIES
+
+    geodfs_size = get_frames_size(GEODFS)
+    geometries_size = get_frames_size(
+        [geodf for geodfs in GEOMETRIES.values() for geodf in geodfs.values()]
+    )
+
+    location_types = args.location_types or list(LOCATIONS)
+    sessions, sessions_size, sessions_files = measure(
+        lambda: [
+            simulate_session(
+                LOCATIONS, args.question_type, location_types, args.n_questions, rng
+            )
+            for _ in range(args.sessions)
+        ]
+    )
+
+    from lib import map
+
+    questions = [
+        session.get_question(id) for session in sessions for id in session._questions
+    ][: args.maps]
+    _, maps_size, maps_files = measure(lambda: prefetch_map_payloads(map, questions))
+    prefetch_cache_size = map.get_prefetch_cache_size()
+    _, blank_maps_size, blank_maps_files = measure(
+        lambda: [map.create_blank_map(satellite) for satellite in [False, True]]
+    )
+    peak_size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    n_sessions = max(len(sessions), 1)
+    n_maps = max(min(len(questions), map.MAX_PREFETCHED_PAYLOADS), 1)
+    print_sizes(
+        "Allocated per subsystem",
+        [
+            ("geodata", geodata_size),
+            ("  frames (pandas)", geodfs_size),
+            ("  geometry index frames (pandas)", geometries_size),
+            (f"sessions ({len(sessions)})", sessions_size),
+            ("  per session", sessions_size / n_sessions),
+            (f"map prefetch cache ({n_maps} payloads)", maps_size),
+            ("  per map payload", maps_size / n_maps),
+            ("  held by payloads", prefetch_cache_size),
+            ("blank map cache (2 maps)", blank_maps_size),
+            ("peak traced", peak_size),
+        ],
+    )
+    breakdowns = [get_quiz_breakdown(session) for session in sessions]
+    print_sizes(
+        "Held per session, mean",
+        [
+            (name, sum(b[name] for b in breakdowns) / n_sessions)
+            for name in (breakdowns[0] if breakdowns else [])
+        ],
+    )
+    for title, files in [
+        ("geodata", geodata_files),
+        ("sessions", sessions_files),
+        ("map prefetch cache", maps_files),
+        ("blank map cache", blank_maps_files),
+    ]:
+        files = sorted(files, key=lambda f: f[1], reverse=True)[: args.top]
+        print_sizes(f"Top files allocating for {title}", files)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--n-questions", type=int, default=20)
+    parser.add_argument(
+        "--question-type",
+        choices=["Open answer", "Multiple choice"],
+        default="Multiple choice",
+    )
+    parser.add_argument("--location-types", nargs="+", default=None)
+    parser.add_argument("--maps", type=int, default=64)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -1 +1,2 @@
 from models.quizz import Quiz, Question, QuizFinishedError
+from models.statistics import StatisticsStore
@@ -1,10 +1,12 @@
 from __future__ import annotations
 from rapidfuzz import fuzz
 import random
+import time
 
 from config import CONFIG
 
 CONSTANTS = CONFIG["constants"]
+MIN_QUESTION_WEIGHT = 1e-6
 
 
 def check_finish(func):
@@ -32,18 +34,21 @@ class Quiz:
         question_type: str = "Open answer",
         location_types: list[str] = ["streets"],
         n_questions: int | None = None,
+        weights: dict[str, dict[str, float]] | None = None,
     ) -> None:
         # Static
         self._location_types: list[str] = location_types
         self._question_type: str = question_type
         self._memory: int = CONSTANTS["question_memory"]
         self._questions: dict = dict()
-        self.init_questions(location_input, n_questions)
+        self._question_weights: dict[str, float] = dict()
+        self.init_questions(location_input, n_questions, weights)
 
         # Dynamic
         self._status: str = "Initialized"
+        self._next_question_id: str | None = None
         self._question_tracker: _QuestionTracker = _QuestionTracker(
-            set(self._questions.keys())
+            set(self._questions.keys()), self._question_weights
         )
 
     @property
@@ -66,18 +71,27 @@ class Quiz:
     def n_questions_skipped(self):
         return self._question_tracker.n_skipped
 
+    @property
+    def events(self) -> list[tuple[str, str, float]]:
+        return self._question_tracker.events
+
     def init_questions(
         self,
         location_input: dict[str, dict[str, dict[str, str]]],
         n_questions: int | None,
+        weights: dict[str, dict[str, float]] | None = None,
     ) -> None:
         if n_questions < 1:
             raise ValueError("Number of questions need to be at least 1.")
         questions = self._generate_questions(location_input)
         if not questions:
             raise ValueError("Could not generate questions from location input.")
-        sampled_questions = self._sample_from_questions(questions, n_questions)
+        question_weights = self._get_question_weights(questions, weights)
+        sampled_questions = self._sample_from_questions(
+            questions, n_questions, question_weights
+        )
         self._questions = {q.id: q for q in sampled_questions}
+        self._question_weights = {id: question_weights[id] for id in self._questions}
 
     def _generate_questions(
         self, location_input: dict[str, dict[str, dict[str, str]]]
@@ -102,12 +116,39 @@ class Quiz:
                 )
         return questions
 
+    def _get_question_weights(
+        self,
+        questions: set[Question],
+        weights: dict[str, dict[str, float]] | None,
+    ) -> dict[str, float]:
+        """
+        Combines weights from the config with the provided weights (e.g. based on
+        aggregated statistics), per location type and name. Defaults to 1.
+        """
+        weights = weights or dict()
+        config_weights = CONSTANTS["question_weights"]
+        question_weights = dict()
+        for question in questions:
+            type, name = question.location_type, question.location_name
+            config_weight = config_weights.get(type, dict()).get(name, 1.0)
+            provided_weight = weights.get(type, dict()).get(name, 1.0)
+            question_weights[question.id] = config_weight * provided_weight
+        return question_weights
+
     def _sample_from_questions(
-        self, questions: set[Question], n_questions: int | None
+        self,
+        questions: set[Question],
+        n_questions: int | None,
+        question_weights: dict[str, float],
     ) -> set[Question]:
         if not n_questions or n_questions >= len(questions):
             return questions
-        sampled_ids = random.sample([q.id for q in questions], n_questions)
+        sampler = _WeightedSampler(question_weights, set(question_weights))
+        sampled_ids = set()
+        for _ in range(n_questions):
+            sampled_id = sampler.sample()
+            sampler.remove(sampled_id)
+            sampled_ids.add(sampled_id)
         return {q for q in questions if q.id in sampled_ids}
 
     def start_quiz(self) -> None:
@@ -124,29 +165,63 @@ class Quiz:
     def ask_question(self) -> Question:
         return self.current_question or self._ask_new_question()
 
-    def _ask_new_question(self) -> Question:
+    def peek_next(self) -> Question | None:
         """
-        Ensures skipped questions, if any, are asked last.
+        Picks the question to ask after the current one is answered or revealed,
+        s.t. it can be prepared in advance. Returns None if there is none left.
         """
-        remaining_question_ids = self._question_tracker.remaining
-        if remaining_question_ids > self._question_tracker._skipped:
-            remaining_question_ids = (
-                remaining_question_ids - self._question_tracker._skipped
-            )
-        sampled_question_id = self._sample_random_question_id(remaining_question_ids)
+        if self._status == "Finished":
+            return None
+        if not self._is_askable(self._next_question_id):
+            exclude = set()
+            if self.current_question:
+                exclude.add(self.current_question.id)
+            self._next_question_id = self._sample_question_id(exclude)
+        if self._next_question_id is None:
+            return None
+        return self.get_question(self._next_question_id)
+
+    def _ask_new_question(self) -> Question:
+        sampled_question_id = self._next_question_id
+        if not self._is_askable(sampled_question_id):
+            sampled_question_id = self._sample_question_id()
+        self._next_question_id = None
         current_question = self.get_question(sampled_question_id)
         current_question.set_multiple_choice_options()
         self._question_tracker.update_current(current_question)
         self._question_tracker.append_history()
         return current_question
 
-    def _sample_random_question_id(self, ids: list[str]) -> str:
-        for mem in range(self._memory, 0, -1):
-            ids_excl_memory = ids - set(self._question_tracker._history[-mem:])
-            if ids_excl_memory:
-                ids = ids_excl_memory
-                break
-        return random.sample(sorted(ids), 1)[0]
+    def _is_askable(self, id: str | None) -> bool:
+        """
+        Whether a peeked question can still be asked next: it is remaining, and only
+        skipped if no others are left. The current question is considered done, as it
+        will be answered or revealed before the next is asked.
+        """
+        tracker = self._question_tracker
+        current_id = self.current_question.id if self.current_question else None
+        if id is None or id == current_id:
+            return False
+        n_pending = len(tracker.pending_sampler) - (
+            current_id in tracker.pending_sampler
+        )
+        return id in tracker.pending_sampler or (
+            not n_pending and id in tracker.skipped_sampler
+        )
+
+    def _sample_question_id(self, exclude: set[str] = set()) -> str | None:
+        """
+        Ensures skipped questions, if any, are asked last. Relaxes the question
+        memory if there are not enough questions left.
+        """
+        tracker = self._question_tracker
+        for sampler in [tracker.pending_sampler, tracker.skipped_sampler]:
+            for mem in range(self._memory, -1, -1):
+                recent_ids = set(tracker._history[-mem:]) if mem else set()
+                sampled_id = sampler.sample(recent_ids | exclude)
+                if sampled_id is not None:
+                    return sampled_id
+        return None
 
     @check_finish
     def skip_question(self) -> None:
@@ -177,25 +252,23 @@ class Quiz:
         return {
             "n_questions": self.n_questions_total,
             "n_correct_answers": self._question_tracker.n_correct,
-            "n_first_try": len(
-                [
-                    q
-                    for q in self._question_tracker._correct
-                    if q not in self._question_tracker._incorrect
-                ]
-            ),
+            "n_first_try": self._question_tracker.n_first_try,
             "n_revealed": self._question_tracker.n_revealed,
         }
 
 
 class _QuestionTracker:
     """
-    Only uses ids.
+    Only uses ids. Every state transition is appended to an event log of
+    (question id, event, timestamp) tuples, which can be aggregated after the quiz.
     """
 
-    def __init__(self, all_question_ids=set[str]) -> None:
+    def __init__(
+        self, all_question_ids: set[str], weights: dict[str, float] | None = None
+    ) -> None:
         # Static
         self._all: set[str] = all_question_ids
+        weights = weights or dict.fromkeys(all_question_ids, 1.0)
 
         # Dynamic
         self._current_question: Question = None
@@ -204,6 +277,27 @@ class _QuestionTracker:
         self._revealed: set[str] = set()
         self._correct: set[str] = set()
         self._incorrect: set[str] = set()
+        self._events: list[tuple[str, str, float]] = list()
+        self._pending_sampler = _WeightedSampler(weights, all_question_ids)
+        self._skipped_sampler = _WeightedSampler(weights, set())
+
+    @property
+    def events(self) -> list[tuple[str, str, float]]:
+        return self._events
+
+    @property
+    def pending_sampler(self) -> _WeightedSampler:
+        """
+        Remaining questions that have not been skipped.
+        """
+        return self._pending_sampler
+
+    @property
+    def skipped_sampler(self) -> _WeightedSampler:
+        """
+        Remaining questions that have been skipped.
+        """
+        return self._skipped_sampler
 
     @property
     def n_history(self) -> int:
@@ -225,6 +319,10 @@ class _QuestionTracker:
     def n_incorrect(self) -> int:
         return len(self._incorrect)
 
+    @property
+    def n_first_try(self) -> int:
+        return len(self._correct - self._incorrect)
+
     @property
     def remaining(self) -> set[str]:
         return self._all - self._revealed - self._correct
@@ -241,19 +339,143 @@ class _QuestionTracker:
 
     def append_history(self) -> None:
         self._history.append(self._current_question.id)
+        self._log_event("asked")
 
     def mark_skipped(self) -> None:
-        self._skipped.add(self._current_question.id)
+        self._mark(self._skipped, "skipped")
+        self._pending_sampler.remove(self._current_question.id)
+        self._skipped_sampler.insert(self._current_question.id)
 
     def mark_revealed(self) -> None:
-        self._revealed.add(self._current_question.id)
+        self._mark(self._revealed, "revealed")
         self._skipped.discard(self._current_question.id)
+        self._remove_from_samplers()
 
     def mark_correct(self) -> None:
-        self._correct.add(self._current_question.id)
+        self._mark(self._correct, "correct")
+        self._remove_from_samplers()
 
     def mark_incorrect(self) -> None:
-        self._incorrect.add(self._current_question.id)
+        self._mark(self._incorrect, "incorrect")
+
+    def _mark(self, ids: set[str], event: str) -> None:
+        ids.add(self._current_question.id)
+        self._log_event(event)
+
+    def _log_event(self, event: str) -> None:
+        self._events.append((self._current_question.id, event, time.time()))
+
+    def _remove_from_samplers(self) -> None:
+        self._pending_sampler.remove(self._current_question.id)
+        self._skipped_sampler.remove(self._current_question.id)
+
+
+class _WeightedSampler:
+    """
+    Weighted sampling without replacement over question ids, backed by a Fenwick tree
+    over the weights s.t. drawing, removing and inserting an id are O(log n).
+    """
+
+    def __init__(self, weights: dict[str, float], active_ids: set[str]) -> None:
+        # Static
+        self._ids: list[str] = sorted(weights)
+        self._positions: dict[str, int] = {id: i for i, id in enumerate(self._ids)}
+        self._base_weights: list[float] = [
+            max(weights[id], MIN_QUESTION_WEIGHT) for id in self._ids
+        ]
+
+        # Dynamic
+        self._active: set[str] = set(active_ids)
+        self._weights: list[float] = list()
+        self._tree: list[float] = list()
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._active
+
+    def insert(self, id: str) -> None:
+        if id in self._active:
+            return
+        self._active.add(id)
+        self._set_weight(id, self._base_weights[self._positions[id]])
+
+    def remove(self, id: str) -> None:
+        if id not in self._active:
+            return
+        self._active.discard(id)
+        self._set_weight(id, 0.0)
+
+    def sample(self, exclude: set[str] = set()) -> str | None:
+        """
+        Draws an active id proportional to its weight, without removing it. Excluded
+        ids are temporarily zeroed. Returns None if no ids are left to draw from.
+        """
+        excluded = [id for id in exclude if id in self._active]
+        if len(excluded) == len(self._active):
+            return None
+        for id in excluded:
+            self._set_weight(id, 0.0)
+        try:
+            return self._draw(set(excluded))
+        finally:
+            for id in excluded:
+                self._set_weight(id, self._base_weights[self._positions[id]])
+
+    def _draw(self, excluded: set[str] = set()) -> str:
+        for _ in range(2):
+            position = self._find(random.random() * self._prefix_sum(len(self._ids)))
+            if position < len(self._ids) and self._weights[position] > 0:
+                return self._ids[position]
+            # Floating point drift in the tree, start over from the exact weights.
+            self._build(excluded)
+        raise RuntimeError("Could not draw from weighted sampler.")
+
+    def _build(self, excluded: set[str] = set()) -> None:
+        """
+        Excluded ids keep a zero weight, s.t. a rebuild during a draw respects them.
+        """
+        self._weights = [
+            weight if id in self._active and id not in excluded else 0.0
+            for id, weight in zip(self._ids, self._base_weights)
+        ]
+        self._tree = [0.0] + self._weights
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def _set_weight(self, id: str, weight: float) -> None:
+        position = self._positions[id]
+        delta = weight - self._weights[position]
+        self._weights[position] = weight
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix_sum(self, n: int) -> float:
+        total = 0.0
+        while n > 0:
+            total += self._tree[n]
+            n -= n & -n
+        return total
+
+    def _find(self, target: float) -> int:
+        """
+        Smallest position whose prefix sum, including itself, exceeds the target.
+        """
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= target:
+                position = next_position
+                target -= self._tree[next_position]
+            step >>= 1
+        return position
 
 
 class QuizFinishedError(Exception):
@@ -298,6 +520,14 @@ class Question:
     def id(self):
         return self._id
 
+    @property
+    def location_name(self):
+        return self._location_name
+
+    @property
+    def location_type(self):
+        return self._location_type
+
     @property
     def question_prompt(self):
         return self._question_prompt
@@ -328,9 +558,16 @@ class Question:
         return is_correct
 
     def generate_multiple_choice_options(self, number=4):
-        options = random.sample(
-            sorted(self._all_options - set([self._answer])), number - 1
-        ) + [self._answer]
+        """
+        Uses filler answers if there are not enough other locations of the same type.
+        """
+        candidates = sorted(self._all_options - set([self._answer]))
+        if len(candidates) < number - 1:
+            fillers = CONSTANTS["filler_answers"].get(self._location_type, [])
+            candidates += sorted(set(fillers) - set(candidates) - set([self._answer]))
+        options = random.sample(candidates, min(number - 1, len(candidates))) + [
+            self._answer
+        ]
         random.shuffle(options)
         return options
 
@@ -0,0 +1,224 @@
+from __future__ import annotations
+from collections import defaultdict
+import sqlite3
+import threading
+import uuid
+
+from models.quizz import Quiz
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    quiz_id TEXT NOT NULL,
+    user TEXT NOT NULL,
+    location_name TEXT NOT NULL,
+    location_type TEXT NOT NULL,
+    event TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS location_stats (
+    location_name TEXT NOT NULL,
+    location_type TEXT NOT NULL,
+    n_asked INTEGER NOT NULL DEFAULT 0,
+    n_first_try INTEGER NOT NULL DEFAULT 0,
+    n_correct INTEGER NOT NULL DEFAULT 0,
+    n_incorrect INTEGER NOT NULL DEFAULT 0,
+    n_revealed INTEGER NOT NULL DEFAULT 0,
+    n_skipped INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_type, location_name)
+);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user TEXT PRIMARY KEY,
+    n_quizzes INTEGER NOT NULL DEFAULT 0,
+    n_questions INTEGER NOT NULL DEFAULT 0,
+    n_first_try INTEGER NOT NULL DEFAULT 0,
+    n_correct INTEGER NOT NULL DEFAULT 0,
+    n_revealed INTEGER NOT NULL DEFAULT 0,
+    n_skipped INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS user_stats_first_try_rate
+    ON user_stats (CAST(n_first_try AS REAL) / n_questions DESC, n_questions DESC);
+"""
+
+LOCATION_COUNTERS = [
+    "n_asked",
+    "n_first_try",
+    "n_correct",
+    "n_incorrect",
+    "n_revealed",
+    "n_skipped",
+]
+USER_COUNTERS = [
+    "n_quizzes",
+    "n_questions",
+    "n_first_try",
+    "n_correct",
+    "n_revealed",
+    "n_skipped",
+]
+
+
+class StatisticsStore:
+    """
+    Append-only log of quiz events, with counters per location and per user that are
+    updated incrementally when a quiz is recorded. Queries only read the counters, so
+    they do not depend on the size of the event log.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def record_quiz(self, quiz: Quiz, user: str = "anonymous") -> str:
+        """
+        Stores all events of a quiz and updates the counters in a single transaction.
+        """
+        quiz_id = uuid.uuid4().hex
+        event_rows = []
+        per_question = defaultdict(set)
+        for question_id, event, created_at in quiz.events:
+            question = quiz.get_question(question_id)
+            event_rows.append(
+                (
+                    quiz_id,
+                    user,
+                    question.location_name,
+                    question.location_type,
+                    event,
+                    created_at,
+                )
+            )
+            per_question[question_id].add(event)
+
+        location_rows = []
+        user_counts = dict.fromkeys(USER_COUNTERS, 0)
+        user_counts["n_quizzes"] = 1
+        user_counts["n_questions"] = quiz.n_questions_total
+        for question_id, events in per_question.items():
+            question = quiz.get_question(question_id)
+            counts = _count_question_events(events)
+            location_rows.append(
+                (question.location_name, question.location_type)
+                + tuple(counts[c] for c in LOCATION_COUNTERS)
+            )
+            for counter in ["n_first_try", "n_correct", "n_revealed", "n_skipped"]:
+                user_counts[counter] += counts[counter]
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", event_rows
+            )
+            self._connection.executemany(
+                _upsert_statement(
+                    "location_stats",
+                    ["location_name", "location_type"],
+                    LOCATION_COUNTERS,
+                ),
+                location_rows,
+            )
+            self._connection.execute(
+                _upsert_statement("user_stats", ["user"], USER_COUNTERS),
+                (user,) + tuple(user_counts[c] for c in USER_COUNTERS),
+            )
+        return quiz_id
+
+    def get_location_statistics(
+        self, location_name: str, location_type: str = "streets"
+    ) -> dict[str, float] | None:
+        rows = self._query(
+            f"SELECT {_LOCATION_COLUMNS} FROM location_stats "
+            "WHERE location_name = ? AND location_type = ?",
+            (location_name, location_type),
+        )
+        return rows[0] if rows else None
+
+    def get_hardest_locations(
+        self, n: int = 10, location_type: str = "streets", min_asked: int = 1
+    ) -> list[dict[str, float]]:
+        """
+        Locations with the lowest first-try rate, most often revealed first on ties.
+        """
+        return self._query(
+            f"SELECT {_LOCATION_COLUMNS} FROM location_stats "
+            "WHERE location_type = ? AND n_asked >= ? "
+            "ORDER BY first_try_rate ASC, reveal_rate DESC, location_name ASC "
+            "LIMIT ?",
+            (location_type, min_asked, n),
+        )
+
+    def get_leaderboard(
+        self, n: int = 10, min_questions: int = 1
+    ) -> list[dict[str, float]]:
+        """
+        Users with the highest first-try rate, only counting users that answered at
+        least `min_questions` questions s.t. a single lucky quiz does not top the board.
+        """
+        return self._query(
+            "SELECT *, CAST(n_first_try AS REAL) / n_questions AS first_try_rate "
+            "FROM user_stats WHERE n_questions >= ? "
+            "ORDER BY first_try_rate DESC, n_questions DESC LIMIT ?",
+            (max(min_questions, 1), n),
+        )
+
+    def get_weights(
+        self, location_type: str = "streets", prior: int = 1
+    ) -> dict[str, float]:
+        """
+        Sampling weight per location equal to its miss rate, smoothed with one miss
+        per `prior` asks s.t. easy locations can still be sampled.
+        """
+        rows = self._query(
+            "SELECT location_name, n_asked, n_first_try FROM location_stats "
+            "WHERE location_type = ?",
+            (location_type,),
+        )
+        return {
+            row["location_name"]: (row["n_asked"] - row["n_first_try"] + prior)
+            / (row["n_asked"] + prior)
+            for row in rows
+        }
+
+    def n_events(self) -> int:
+        return self._query("SELECT COUNT(*) AS n FROM events")[0]["n"]
+
+    def _query(self, statement: str, parameters: tuple = ()) -> list[dict]:
+        with self._lock:
+            cursor = self._connection.execute(statement, parameters)
+            return [dict(row) for row in cursor.fetchall()]
+
+
+_LOCATION_COLUMNS = (
+    "*, "
+    "CAST(n_first_try AS REAL) / n_asked AS first_try_rate, "
+    "CAST(n_revealed AS REAL) / n_asked AS reveal_rate, "
+    "CAST(n_skipped AS REAL) / n_asked AS skip_rate"
+)
+
+
+def _count_question_events(events: set[str]) -> dict[str, int]:
+    """
+    Per quiz, every counter is at most one for a single question.
+    """
+    return {
+        "n_asked": int("asked" in events),
+        "n_first_try": int("correct" in events and "incorrect" not in events),
+        "n_correct": int("correct" in events),
+        "n_incorrect": int("incorrect" in events),
+        "n_revealed": int("revealed" in events),
+        "n_skipped": int("skipped" in events),
+    }
+
+
+def _upsert_statement(table: str, keys: list[str], counters: list[str]) -> str:
+    columns = keys + counters
+    placeholders = ", ".join("?" for _ in columns)
+    increments = ", ".join(f"{c} = {c} + excluded.{c}" for c in counters)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {increments}"
+    )
@@ -0,0 +1,54 @@
+from geopandas import GeoDataFrame
+from shapely.geometry import LineString, Point, Polygon
+
+from data.index import build_geometry_index
+
+
+class TestBuildGeometryIndex:
+    """
+    src.data.index.build_geometry_index
+    """
+
+    def test_build_geometry_index(self):
+        """
+        should index geometries per location type, preferring matching geometries.
+        """
+        # Arrange
+        square = Polygon([(4.0, 51.0), (4.1, 51.0), (4.1, 51.1), (4.0, 51.1)])
+        geodfs = [
+            GeoDataFrame(
+                {
+                    "name": [
+                        "Coolsingel",
+                        "Schouwburgplein",
+                        "Euromast",
+                        ["Lijnbaan", "Coolsingel"],
+                        None,
+                    ],
+                    "geometry": [
+                        LineString([(4.0, 51.0), (4.1, 51.1)]),
+                        LineString([(4.0, 51.0), (4.0, 51.1)]),
+                        Point(4.46, 51.9),
+                        LineString([(4.1, 51.1), (4.2, 51.2)]),
+                        LineString([(4.2, 51.2), (4.3, 51.3)]),
+                    ],
+                }
+            ),
+            GeoDataFrame({"name": ["Schouwburgplein"], "geometry": [square]}),
+            GeoDataFrame({"geometry": [Point(4.46, 51.9)]}),
+        ]
+        locations = {
+            "streets": {"Coolsingel": {}, "Lijnbaan": {}, "Unknown": {}},
+            "areas": {"Schouwburgplein": {}},
+            "landmarks": {"Euromast": {}},
+        }
+
+        # Act
+        index = build_geometry_index(geodfs, locations)
+
+        # Assert
+        assert set(index["streets"]) == {"Coolsingel", "Lijnbaan"}
+        assert len(index["streets"]["Coolsingel"]) == 2
+        assert len(index["streets"]["Lijnbaan"]) == 1
+        assert list(index["areas"]["Schouwburgplein"].geom_type) == ["Polygon"]
+        assert list(index["landmarks"]["Euromast"].geom_type) == ["Point"]
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from threading import Event
+
+import pytest
+from geopandas import GeoDataFrame
+from shapely.geometry import LineString, MultiPoint, Point, Polygon
+
+from lib import map
+from lib.map import calculate_centre_coord
+
+
+class TestCalculateCentreCoord:
+    """
+    src.lib.map.calculate_centre_coord
+    """
+
+    def test_polygon(self):
+        """
+        should place the centre inside the largest polygon, away from its edges.
+        """
+        # Arrange
+        u_shape = Polygon(
+            [(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3)]
+        )
+        small_square = Polygon([(10, 10), (10.1, 10), (10.1, 10.1), (10, 10.1)])
+        geometries = {
+            "areas": {
+                "Het Park": GeoDataFrame(
+                    {"name": ["Het Park"] * 2, "geometry": [small_square, u_shape]}
+                )
+            }
+        }
+
+        # Act
+        lat, lon = calculate_centre_coord("Het Park", "areas", geometries)
+
+        # Assert
+        assert u_shape.contains(Point(lon, lat))
+        assert lat < 1.0
+
+    def test_point(self):
+        """
+        should average the coordinates of all points.
+        """
+        # Arrange
+        geometries = {
+            "landmarks": {
+                "Euromast": GeoDataFrame(
+                    {
+                        "name": ["Euromast"] * 2,
+                        "geometry": [
+                            Point(4.0, 51.0),
+                            MultiPoint([(4.2, 51.2), (4.4, 51.4)]),
+                        ],
+                    }
+                )
+            }
+        }
+
+        # Act
+        lat, lon = calculate_centre_coord("Euromast", "landmarks", geometries)
+
+        # Assert
+        assert lat == pytest.approx(51.2)
+        assert lon == pytest.approx(4.2)
+
+
+class TestPrefetchMapPayload:
+    """
+    src.lib.map.prefetch_map_payload, src.lib.map.get_map_payload
+    """
+
+    def patch_map(self, monkeypatch, max_payloads: int = 64) -> tuple[list, Event]:
+        """
+        Small geometry dict, an empty cache, and a build that records its calls and
+        waits until released.
+        """
+        geometries = {
+            "streets": {
+                name: GeoDataFrame(
+                    {
+                        "name": [name],
+                        "geometry": [LineString([(4.4, 51.9), (4.5, 52)])],
+                    },
+                    crs="EPSG:4326",
+                )
+                for name in ["A", "B", "C", "D", "E"]
+            }
+        }
+        calls, release = [], Event()
+        build_map_payload = map.build_map_payload
+
+        def build_and_record(location, location_type, _geometries):
+            calls.append(location)
+            release.wait(timeout=10)
+            return build_map_payload(location, location_type, _geometries)
+
+        monkeypatch.setattr(map, "GEOMETRIES", geometries)
+        monkeypatch.setattr(map, "MAX_PREFETCHED_PAYLOADS", max_payloads)
+        monkeypatch.setattr(map, "_prefetched_payloads", OrderedDict())
+        monkeypatch.setattr(map, "build_map_payload", build_and_record)
+        return calls, release
+
+    def test_prefetched(self, monkeypatch):
+        """
+        should use the prefetched payload, and build on the spot otherwise.
+        """
+        # Arrange
+        calls, release = self.patch_map(monkeypatch)
+        release.set()
+
+        # Act
+        map.prefetch_map_payload("A", "streets")
+        feature_group_a, centre_a = map.get_map_payload("A", "streets")
+        feature_group_b, centre_b = map.get_map_payload("B", "streets")
+
+        # Assert
+        assert calls == ["A", "B"]
+        assert feature_group_a.layer_name == "A"
+        assert feature_group_b.layer_name == "B"
+        assert centre_a == pytest.approx((51.95, 4.45))
+
+    def test_eviction(self, monkeypatch):
+        """
+        should evict and cancel the oldest payloads beyond the maximum.
+        """
+        # Arrange
+        calls, release = self.patch_map(monkeypatch, max_payloads=1)
+
+        # Act
+        for location in ["A", "B", "C", "D", "E"]:
+            map.prefetch_map_payload(location, "streets")
+        release.set()
+        map.get_map_payload("E", "streets")
+        map.get_map_payload("C", "streets")
+
+        # Assert
+        assert "C" not in calls[:-1]
+        assert calls[-1] == "C"
+        assert "E" in calls
@@ -0,0 +1,34 @@
+import random
+
+from lib.profiling import get_quiz_breakdown, simulate_session
+from data import LOCATIONS
+
+
+class TestProfiling:
+    """
+    src.lib.profiling
+    """
+
+    def test_get_quiz_breakdown(self):
+        """
+        should report the bytes held per component of a simulated session.
+        """
+        # Arrange
+        quiz = simulate_session(
+            LOCATIONS, "Multiple choice", ["streets"], 10, random.Random(0)
+        )
+
+        # Act
+        breakdown = get_quiz_breakdown(quiz)
+
+        # Assert
+        assert quiz.status == "Finished"
+        assert list(breakdown) == [
+            "questions",
+            "history",
+            "events",
+            "samplers",
+            "tracker",
+            "other",
+        ]
+        assert all(size > 0 for size in breakdown.values())
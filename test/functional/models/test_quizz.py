@@ -1,6 +1,7 @@
 import pytest
 
 from models import Quiz, QuizFinishedError
+from models.quizz import _WeightedSampler
 from data import LOCATIONS
 
 
@@ -51,3 +52,125 @@ class TestQuizz:
         assert statistics["n_correct_answers"] == n_questions - 10
         assert statistics["n_first_try"] == n_questions - 20
         assert statistics["n_revealed"] == 10
+
+    def test_weighted_sampling(self):
+        """
+        should favour heavy questions, but not ask them again within memory.
+        """
+        # Arrange
+        names = sorted(LOCATIONS["streets"])
+        heavy_names = names[:5]
+        weights = {"streets": {name: 1e6 for name in heavy_names}}
+        weights["streets"][heavy_names[0]] = 1e12
+        quiz = Quiz(
+            location_input=LOCATIONS,
+            n_questions=5,
+            question_type="Open answer",
+            location_types=["streets"],
+            weights=weights,
+        )
+
+        # Act
+        quiz.start_quiz()
+        first_question = quiz.ask_question()
+        for _ in range(5):
+            quiz.skip_question()
+            quiz.ask_question()
+        asked_after_memory = quiz.ask_question()
+        quiz.skip_question()
+        asked_within_memory = quiz.ask_question()
+
+        # Assert
+        assert {quiz.get_question(id).answer for id in quiz._questions} == set(
+            heavy_names
+        )
+        assert first_question.answer == heavy_names[0]
+        assert asked_after_memory == first_question
+        assert asked_within_memory != first_question
+
+    def test_peek_next(self):
+        """
+        should ask the peeked question next, and skipped questions last.
+        """
+        # Arrange
+        quiz = Quiz(
+            location_input=LOCATIONS,
+            n_questions=5,
+            question_type="Open answer",
+            location_types=["streets"],
+        )
+        quiz.start_quiz()
+        skipped_question = quiz.ask_question()
+        quiz.skip_question()
+
+        # Act
+        asked_questions, peeked_questions = [], []
+        while quiz.status != "Finished":
+            asked_questions.append(quiz.ask_question())
+            peeked_questions.append(quiz.peek_next())
+            quiz.check_answer(quiz.current_question.answer, progress_quiz=True)
+
+        # Assert
+        assert asked_questions[1:] == peeked_questions[:-1]
+        assert asked_questions[-1] == skipped_question
+        assert peeked_questions[-1] is None
+
+    def test_events(self):
+        """
+        should log every skip and wrong answer, also when repeated.
+        """
+        # Arrange
+        quiz = Quiz(
+            location_input=LOCATIONS,
+            n_questions=1,
+            question_type="Open answer",
+            location_types=["streets"],
+        )
+        quiz.start_quiz()
+        question = quiz.ask_question()
+
+        # Act
+        quiz.skip_question()
+        quiz.ask_question()
+        quiz.skip_question()
+        quiz.ask_question()
+        quiz.check_answer("Wrong", progress_quiz=False)
+        quiz.check_answer("Wrong", progress_quiz=False)
+        quiz.check_answer(question.answer, progress_quiz=True)
+
+        # Assert
+        assert [event for _, event, _ in quiz.events] == [
+            "asked",
+            "skipped",
+            "asked",
+            "skipped",
+            "asked",
+            "incorrect",
+            "incorrect",
+            "correct",
+        ]
+        timestamps = [timestamp for _, _, timestamp in quiz.events]
+        assert timestamps == sorted(timestamps)
+
+
+class TestWeightedSampler:
+    """
+    src.models.quizz._WeightedSampler
+    """
+
+    def test_sample_excluded_after_drift(self):
+        """
+        should not draw excluded ids, also when the tree is rebuilt due to drift.
+        """
+        # Arrange
+        weights = {"a": 1e12, "b": 1e-6, "c": 1e-6}
+
+        # Act
+        sampled_ids = set()
+        for _ in range(200):
+            sampler = _WeightedSampler(weights, set(weights))
+            sampler.remove("a")
+            sampled_ids.add(sampler.sample({"b"}))
+
+        # Assert
+        assert sampled_ids == {"c"}
@@ -0,0 +1,55 @@
+from models import Quiz, StatisticsStore
+from data import LOCATIONS
+
+
+class TestStatisticsStore:
+    """
+    src.models.statistics.StatisticsStore
+    """
+
+    def run_quiz(self, n_wrong: int, n_revealed: int) -> Quiz:
+        quiz = Quiz(
+            location_input=LOCATIONS,
+            n_questions=10,
+            question_type="Open answer",
+            location_types=["streets"],
+        )
+        quiz.start_quiz()
+        for i in range(10):
+            question = quiz.ask_question()
+            if i < n_wrong:
+                quiz.check_answer("Wrong", progress_quiz=False)
+            if i < n_revealed:
+                quiz.reveal_answer(progress_quiz=True)
+            else:
+                quiz.check_answer(question.answer, progress_quiz=True)
+        return quiz
+
+    def test_record_quiz(self):
+        """
+        should aggregate events of finished quizzes into user and location counters.
+        """
+        # Arrange
+        store = StatisticsStore()
+        quiz_1 = self.run_quiz(n_wrong=4, n_revealed=2)
+        quiz_2 = self.run_quiz(n_wrong=0, n_revealed=0)
+
+        # Act
+        for _ in range(4):
+            store.record_quiz(quiz_1, user="alice")
+        store.record_quiz(quiz_2, user="bob")
+        store.record_quiz(quiz_2, user="bob")
+        store.record_quiz(quiz_2, user="carol")
+        leaderboard = store.get_leaderboard(n=3, min_questions=20)
+        hardest = store.get_hardest_locations(n=1)
+
+        # Assert
+        assert quiz_1.get_statistics()["n_first_try"] == 6
+        assert [row["user"] for row in leaderboard] == ["bob", "alice"]
+        assert leaderboard[0]["n_quizzes"] == 2
+        assert leaderboard[0]["first_try_rate"] == 1.0
+        assert leaderboard[1]["n_first_try"] == 24
+        assert leaderboard[1]["first_try_rate"] == 0.6
+        assert leaderboard[1]["n_revealed"] == 8
+        assert hardest[0]["first_try_rate"] < 1.0
+        assert store.n_events() == 4 * len(quiz_1.events) + 3 * len(quiz_2.events)